@@ -30,6 +30,8 @@ import rasterio
 import torch
 from absl import logging
 from PIL import Image
+from rasterio.crs import CRS
+from rasterio.transform import Affine
 from torchvision import transforms
 
 from instageo.data.hls_utils import open_mf_tiff_dataset
@@ -95,30 +97,34 @@ def random_crop_and_flip(
 def normalize_and_convert_to_tensor(
     ims: List[Image.Image],
     label: Image.Image | None,
-    mean: List[float],
-    std: List[float],
+    mean: List[float] | torch.Tensor,
+    std: List[float] | torch.Tensor,
     temporal_size: int = 1,
+    normalize: bool = True,
 ) -> Tuple[torch.Tensor, torch.Tensor]:
     """Normalize the images and label and convert them to PyTorch tensors.
 
     Args:
         ims (List[Image.Image]): List of PIL Image objects representing the images.
         label (Image.Image | None): A PIL Image object representing the label.
-        mean (List[float]): The mean of each channel in the image
-        std (List[float]): The standard deviation of each channel in the image
+        mean (List[float] | torch.Tensor): The mean of each channel in the image
+        std (List[float] | torch.Tensor): The standard deviation of each channel in
+            the image
         temporal_size: The number of temporal steps
+        normalize: Flag to apply mean/std normalization. When False the images are
+            only converted to tensors, e.g. when the model normalizes on device.
 
     Returns:
         Tuple[torch.Tensor, torch.Tensor]: A tuple of tensors representing the normalized
         images and label.
     """
-    norm = transforms.Normalize(mean, std)
     ims_tensor = torch.stack([transforms.ToTensor()(im).squeeze() for im in ims])
     _, h, w = ims_tensor.shape
     ims_tensor = ims_tensor.reshape([temporal_size, -1, h, w])  # T*C,H,W -> T,C,H,W
-    ims_tensor = torch.stack([norm(im) for im in ims_tensor]).permute(
-        [1, 0, 2, 3]
-    )  # T,C,H,W -> C,T,H,W
+    if normalize:
+        norm = transforms.Normalize(mean, std)
+        ims_tensor = torch.stack([norm(im) for im in ims_tensor])
+    ims_tensor = ims_tensor.permute([1, 0, 2, 3])  # T,C,H,W -> C,T,H,W
     if label:
         label = torch.from_numpy(np.array(label)).squeeze()
     return ims_tensor, label
@@ -127,21 +133,25 @@ def normalize_and_convert_to_tensor(
 def process_and_augment(
     x: np.ndarray,
     y: np.ndarray | None,
-    mean: List[float],
-    std: List[float],
+    mean: List[float] | torch.Tensor,
+    std: List[float] | torch.Tensor,
     temporal_size: int = 1,
     im_size: int = 224,
     augment: bool = True,
+    gpu_normalize: bool = False,
 ) -> Tuple[torch.Tensor, torch.Tensor]:
     """Process and augment the given images and labels.
 
     Args:
         x (np.ndarray): Numpy array representing the images.
         y (np.ndarray): Numpy array representing the label.
-        mean (List[float]): The mean of each channel in the image
-        std (List[float]): The standard deviation of each channel in the image
+        mean (List[float] | torch.Tensor): The mean of each channel in the image
+        std (List[float] | torch.Tensor): The standard deviation of each channel in
+            the image
         temporal_size: The number of temporal steps
         augment: Flag to perform augmentations in training mode.
+        gpu_normalize: Flag to skip normalization because the model applies it on
+            device.
 
     Returns:
         Tuple[torch.Tensor, torch.Tensor]: A tuple of tensors representing the processed
@@ -155,7 +165,9 @@ def process_and_augment(
         label = Image.fromarray(y.copy().squeeze())
     if augment:
         ims, label = random_crop_and_flip(ims, label, im_size)
-    ims, label = normalize_and_convert_to_tensor(ims, label, mean, std, temporal_size)
+    ims, label = normalize_and_convert_to_tensor(
+        ims, label, mean, std, temporal_size, normalize=not gpu_normalize
+    )
     return ims, label
 
 
@@ -194,26 +206,29 @@ def crop_array(
 def process_test(
     x: np.ndarray,
     y: np.ndarray,
-    mean: List[float],
-    std: List[float],
+    mean: List[float] | torch.Tensor,
+    std: List[float] | torch.Tensor,
     temporal_size: int = 1,
     img_size: int = 512,
     crop_size: int = 224,
     stride: int = 224,
+    gpu_normalize: bool = False,
 ) -> Tuple[torch.Tensor, torch.Tensor]:
     """Process and augment test data.
 
     Args:
         x (np.ndarray): Input image array.
         y (np.ndarray): Corresponding mask array.
-        mean (List[float]): Mean values for normalization.
-        std: (List[float]): Standard deviation values for normalization.
+        mean (List[float] | torch.Tensor): Mean values for normalization.
+        std (List[float] | torch.Tensor): Standard deviation values for normalization.
         temporal_size (int, optional): Temporal dimension size. Defaults to 1.
         img_size (int, optional): Size of the input images. Defaults to
             512.
         crop_size (int, optional): Size of the crops to be extracted from the
             images. Defaults to 224.
         stride (int, optional): Stride for cropping. Defaults to 224.
+        gpu_normalize (bool, optional): Skip normalization because the model applies
+            it on device. Defaults to False.
 
     Returns:
         Tuple[torch.Tensor, torch.Tensor]: Tuple of tensors containing the processed
@@ -225,6 +240,7 @@ def process_test(
         std=std,
         temporal_size=temporal_size,
         augment=False,
+        gpu_normalize=gpu_normalize,
     )
 
     img_crops, mask_crops = [], []
@@ -244,15 +260,18 @@ def process_test(
     return imgs, labels
 
 
-def get_raster_data(
+def get_georeferenced_raster_data(
     fname: str | dict[str, dict[str, str]],
     is_label: bool = True,
     bands: List[int] | None = None,
     no_data_value: int | None = -9999,
     mask_cloud: bool = True,
     water_mask: bool = False,
-) -> np.ndarray:
-    """Load and process raster data from a file.
+) -> Tuple[np.ndarray, CRS, Affine]:
+    """Load and process raster data from a file along with its georeference.
+
+    The CRS and transform are taken from the dataset that is opened to read the data,
+    so callers that need them do not have to open the file again.
 
     Args:
         fname (str): Filename to load data from.
@@ -263,15 +282,19 @@ def get_raster_data(
         water_mask (bool): Perform water masking.
 
     Returns:
-        np.ndarray: Numpy array representing the processed data.
+        Tuple[np.ndarray, CRS, Affine]: Numpy array representing the processed data,
+        its coordinate reference system and its affine transform.
     """
     if isinstance(fname, dict):
         data, mask, crs = open_mf_tiff_dataset(fname, load_masks=False)
+        transform = data.rio.transform()
         data = data.fillna(no_data_value)
         data = data.band_data.values
     else:
         with rasterio.open(fname) as src:
             data = src.read()
+            crs = src.crs
+            transform = src.transform
     if (not is_label) and bands:
         data = data[bands, ...]
     # For some reasons, some few HLS tiles are not scaled in v2.0.
@@ -286,6 +309,38 @@ def get_raster_data(
             band *= 0.0001
         bands.append(band)
     data = np.stack(bands, axis=0)
+    return data, crs, transform
+
+
+def get_raster_data(
+    fname: str | dict[str, dict[str, str]],
+    is_label: bool = True,
+    bands: List[int] | None = None,
+    no_data_value: int | None = -9999,
+    mask_cloud: bool = True,
+    water_mask: bool = False,
+) -> np.ndarray:
+    """Load and process raster data from a file.
+
+    Args:
+        fname (str): Filename to load data from.
+        is_label (bool): Whether the file is a label file.
+        bands (List[int]): Index of bands to select from array.
+        no_data_value (int | None): NODATA value in image raster.
+        mask_cloud (bool): Perform cloud masking.
+        water_mask (bool): Perform water masking.
+
+    Returns:
+        np.ndarray: Numpy array representing the processed data.
+    """
+    data, _, _ = get_georeferenced_raster_data(
+        fname,
+        is_label=is_label,
+        bands=bands,
+        no_data_value=no_data_value,
+        mask_cloud=mask_cloud,
+        water_mask=water_mask,
+    )
     return data
 
 
@@ -19,8 +19,9 @@
 
 """Utils for Running Inference."""
 import os
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, Generator, List
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Generator, Iterable, List
 
 import numpy as np
 import pytorch_lightning as pl
@@ -58,6 +59,8 @@ def sliding_window_inference(
     """
     device = "cuda" if device == "gpu" else device
     _, _, width, height = hls_tile.shape
+    # Transfer the tile once; the windows below are then views of the device copy.
+    hls_tile = hls_tile.to(device, non_blocking=True)
 
     final_prediction = np.zeros((height, width), dtype=np.float32)
     patch_coords = [
@@ -81,13 +84,13 @@ def sliding_window_inference(
         for i in range(0, len(patches), batch_size):
             yield patches[i : i + batch_size]
 
-    with torch.no_grad():
+    with torch.inference_mode():
         for batch_coords in get_batches(patch_coords, batch_size):
             batch_patches = [
                 crop_array(hls_tile, x, y, x + window_size[0], y + window_size[1])
                 for x, y in batch_coords
             ]
-            batch_tensor = torch.stack(batch_patches, dim=0).to(device)
+            batch_tensor = torch.stack(batch_patches, dim=0)
             batch_results = model.predict_step(batch_tensor).detach().cpu().numpy()
 
             for (x, y), result in zip(batch_coords, batch_results):
@@ -98,6 +101,36 @@ def sliding_window_inference(
     return final_prediction
 
 
+def prefetch_map(
+    func: Callable[[Any], Any],
+    items: Iterable[Any],
+    executor: Executor,
+    depth: int = 2,
+) -> Generator[Any, None, None]:
+    """Prefetching Map.
+
+    Applies a function to items on an executor while keeping at most `depth` items
+    in flight ahead of the consumer, so loading upcoming items overlaps with the work
+    done on the current one. Results are yielded in input order.
+
+    Args:
+        func: Function applied to every item.
+        items: Items to process.
+        executor: Executor running `func`.
+        depth: Number of items processed ahead of the one being consumed.
+
+    Yields:
+        Result of `func` for each item, in the order of `items`.
+    """
+    pending: Deque[Future] = deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) > depth:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
 def save_prediction(
     prediction: np.ndarray, file_name: str, output_folder: str, profile: Dict[str, Any]
 ) -> None:
@@ -143,7 +176,7 @@ def chip_inference(
     model.eval()
     model.to(device)
 
-    with torch.no_grad():
+    with torch.inference_mode():
         with ThreadPoolExecutor(max_workers=num_workers) as executor:
             for (data, _), file_names in tqdm(dataloader, desc="Running Inference"):
                 data = data.to(device)
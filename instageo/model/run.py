@@ -8,8 +8,10 @@
 import json
 import logging
 import os
-from functools import partial
-from typing import Any, Callable, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache, partial
+from typing import Any, Callable, Deque, List, Optional, Tuple
 
 import hydra
 import numpy as np
@@ -20,21 +22,30 @@ import torch.nn as nn
 from omegaconf import DictConfig, OmegaConf
 from pytorch_lightning.callbacks import ModelCheckpoint
 from pytorch_lightning.loggers import TensorBoardLogger
+from pytorch_lightning.strategies import DDPStrategy, Strategy
 from torch.utils.data import DataLoader, Dataset
+from torchmetrics.classification import MulticlassConfusionMatrix
 from tqdm import tqdm
 
 from instageo.model.dataloader import (
     InstaGeoDataset,
+    get_georeferenced_raster_data,
     process_and_augment,
-    process_data,
     process_test,
 )
-from instageo.model.infer_utils import chip_inference, sliding_window_inference
+from instageo.model.infer_utils import (
+    chip_inference,
+    prefetch_map,
+    sliding_window_inference,
+)
 from instageo.model.model import PrithviSeg
 
-pl.seed_everything(seed=1042, workers=True)
-torch.backends.cudnn.deterministic = True
-torch.backends.cudnn.benchmark = False
+try:
+    import torch_xla.core.xla_model as xm  # noqa: F401
+
+    _HAS_XLA = True
+except ImportError:
+    _HAS_XLA = False
 
 log = logging.getLogger(__name__)
 log.setLevel(logging.INFO)
@@ -46,24 +57,71 @@ def check_required_flags(required_flags: List[str], config: DictConfig) -> None:
             raise RuntimeError(f"Flag --{flag_name} is required.")
 
 
+def configure_determinism(deterministic: bool) -> None:
+    # Input shapes are fixed, so unless bitwise reproducibility is requested let the
+    # cuDNN autotuner pick the fastest kernels on the first step and reuse them.
+    pl.seed_everything(seed=1042, workers=deterministic)
+    torch.backends.cudnn.deterministic = deterministic
+    torch.backends.cudnn.benchmark = not deterministic
+
+
+@lru_cache(maxsize=None)
 def get_device() -> str:
-    try:
-        import torch_xla.core.xla_model as xm  # noqa: F401
+    if _HAS_XLA:
         device = "tpu"
         logging.info("TPU is available. Using TPU...")
-    except ImportError:
-        if torch.cuda.is_available():
-            device = "gpu"
-            logging.info("GPU is available. Using GPU...")
-        else:
-            device = "cpu"
-            logging.info("Neither GPU nor TPU is available. Using CPU...")
+    elif torch.cuda.is_available():
+        device = "gpu"
+        logging.info("GPU is available. Using GPU...")
+    else:
+        device = "cpu"
+        logging.info("Neither GPU nor TPU is available. Using CPU...")
     return device
 
 
+def get_strategy(accelerator: str, cfg: DictConfig) -> Strategy | str:
+    # DDP only pays off when more than one GPU takes part in training.
+    devices = cfg.train.get("devices", "auto")
+    if devices in ("auto", -1, "-1"):
+        num_devices = torch.cuda.device_count()
+    elif isinstance(devices, str):
+        # Lightning reads "0," as the GPU list [0], not as one device count.
+        num_devices = (
+            len([d for d in devices.split(",") if d.strip()])
+            if "," in devices
+            else int(devices)
+        )
+    elif isinstance(devices, int):
+        num_devices = devices
+    else:
+        num_devices = len(devices)
+    if accelerator != "gpu" or num_devices <= 1:
+        return "auto"
+    return DDPStrategy(
+        find_unused_parameters=False,
+        gradient_as_bucket_view=True,
+        bucket_cap_mb=cfg.train.get("ddp_bucket_mb", 25),
+        static_graph=True,
+    )
+
+
+def cat_samples(tensors: List[torch.Tensor]) -> torch.Tensor:
+    out = None
+    if torch.utils.data.get_worker_info() is not None:
+        # Same as `default_collate`: concatenate straight into shared memory so the
+        # batch is not copied again when it is sent back to the main process.
+        elem = tensors[0]
+        numel = sum(t.numel() for t in tensors)
+        storage = elem._typed_storage()._new_shared(numel, device=elem.device)
+        out = elem.new(storage).resize_(
+            sum(t.shape[0] for t in tensors), *elem.shape[1:]
+        )
+    return torch.cat(tensors, 0, out=out)
+
+
 def eval_collate_fn(batch: tuple[torch.Tensor]) -> tuple[torch.Tensor, torch.Tensor]:
-    data = torch.cat([a[0][0] for a in batch], 0)
-    labels = torch.cat([a[0][1] for a in batch], 0)
+    data = cat_samples([a[0][0] for a in batch])
+    labels = cat_samples([a[0][1] for a in batch])
     return data, labels
 
 
@@ -78,10 +136,20 @@ def create_dataloader(
     dataset: Dataset,
     batch_size: int,
     shuffle: bool = False,
-    num_workers: int = 4,
+    num_workers: int | None = None,
     collate_fn: Optional[Callable] = None,
     pin_memory: bool = True,
+    persistent_workers: bool = True,
+    prefetch_factor: int = 4,
 ) -> DataLoader:
+    if num_workers is None:
+        num_workers = min(8, (os.cpu_count() or 0) // 2)
+    # PyTorch rejects these worker options when loading in the main process.
+    worker_kwargs = (
+        dict(persistent_workers=persistent_workers, prefetch_factor=prefetch_factor)
+        if num_workers > 0
+        else {}
+    )
     return DataLoader(
         dataset,
         batch_size=batch_size,
@@ -89,9 +157,39 @@ def create_dataloader(
         num_workers=num_workers,
         collate_fn=collate_fn,
         pin_memory=pin_memory,
+        **worker_kwargs,
     )
 
 
+class TwoClassConfusionMatrix(MulticlassConfusionMatrix):
+    # Specialization of the 2x2 case: counts come from boolean masks reduced on
+    # device, avoiding the host sync `torch.bincount` needs to size its output.
+    # Unlike `MulticlassConfusionMatrix`, which indexes every target value into the
+    # matrix, targets other than 0, 1 and `ignore_index` are skipped, not counted.
+    def __init__(self, ignore_index: int | None = None) -> None:
+        super().__init__(2, ignore_index=ignore_index, validate_args=False)
+
+    def update(self, preds: torch.Tensor, target: torch.Tensor) -> None:
+        # Logits of shape (N, 2, ...) are compared directly, which matches argmax.
+        if preds.ndim == target.ndim + 1:
+            pred = preds[:, 1] > preds[:, 0]
+        else:
+            pred = preds.bool()
+        positive = target.eq(1)
+        negative = target.eq(0)
+        if self.ignore_index is not None:
+            valid = target.ne(self.ignore_index)
+            positive &= valid
+            negative &= valid
+        true_positive = (pred & positive).sum()
+        false_negative = (~pred & positive).sum()
+        false_positive = (pred & negative).sum()
+        true_negative = (~pred & negative).sum()
+        self.confmat += torch.stack(
+            [true_negative, false_positive, false_negative, true_positive]
+        ).view(2, 2)
+
+
 class PrithviSegmentationModule(pl.LightningModule):
     def __init__(
         self,
@@ -103,6 +201,10 @@ class PrithviSegmentationModule(pl.LightningModule):
         class_weights: List[float] = [1, 2],
         ignore_index: int = -100,
         weight_decay: float = 1e-2,
+        mean: List[float] | torch.Tensor | None = None,
+        std: List[float] | torch.Tensor | None = None,
+        compile_model: bool = False,
+        channels_last: bool = False,
     ) -> None:
         super().__init__()
         self.net = PrithviSeg(
@@ -111,6 +213,23 @@ class PrithviSegmentationModule(pl.LightningModule):
             temporal_step=temporal_step,
             freeze_backbone=freeze_backbone,
         )
+        self.channels_last = channels_last
+        if channels_last:
+            # The network mixes a 5-D patch embedding with 4-D decoder convolutions,
+            # so each weight gets the channels-last layout matching its rank.
+            for param in self.net.parameters():
+                if param.dim() == 5:
+                    param.data = param.data.contiguous(
+                        memory_format=torch.channels_last_3d
+                    )
+                elif param.dim() == 4:
+                    param.data = param.data.contiguous(
+                        memory_format=torch.channels_last
+                    )
+        if compile_model:
+            # Input shapes are fixed by the config, so let inductor specialize on them.
+            # Compiling in place keeps the state dict keys of uncompiled checkpoints.
+            self.net.compile(mode="reduce-overhead", fullgraph=False, dynamic=False)
         weight_tensor = torch.tensor(class_weights).float() if class_weights else None
         self.criterion = nn.CrossEntropyLoss(
             ignore_index=ignore_index, weight=weight_tensor
@@ -118,31 +237,67 @@ class PrithviSegmentationModule(pl.LightningModule):
         self.learning_rate = learning_rate
         self.ignore_index = ignore_index
         self.weight_decay = weight_decay
+        # When mean/std are given, inputs arrive unnormalized and are normalized on
+        # device in `forward`. The buffers are not persisted so checkpoints are
+        # interchangeable between both modes.
+        if mean is not None and std is not None:
+            self.register_buffer(
+                "mean",
+                torch.as_tensor(mean, dtype=torch.float32).view(1, -1, 1, 1, 1),
+                persistent=False,
+            )
+            self.register_buffer(
+                "std",
+                torch.as_tensor(std, dtype=torch.float32).view(1, -1, 1, 1, 1),
+                persistent=False,
+            )
+        else:
+            self.mean = None
+            self.std = None
+        # Confusion matrices are accumulated on-device and only read at epoch end.
+        make_confusion = (
+            partial(TwoClassConfusionMatrix, ignore_index=ignore_index)
+            if num_classes == 2
+            else partial(
+                MulticlassConfusionMatrix,
+                num_classes,
+                ignore_index=ignore_index,
+                validate_args=False,
+            )
+        )
+        self.train_confusion = make_confusion()
+        self.val_confusion = make_confusion()
+        self.test_confusion = make_confusion()
 
     def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.mean is not None:
+            x = (x.to(self.mean.dtype) - self.mean) / self.std
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last_3d)
         return self.net(x)
 
     def training_step(self, batch: Any, batch_idx: int) -> torch.Tensor:
         inputs, labels = batch
         outputs = self.forward(inputs)
-        loss = self.criterion(outputs, labels.long())
+        loss = self.criterion(outputs.float(), labels.long())
         self.log_metrics(outputs, labels, "train", loss)
         return loss
 
     def validation_step(self, batch: Any, batch_idx: int) -> torch.Tensor:
         inputs, labels = batch
         outputs = self.forward(inputs)
-        loss = self.criterion(outputs, labels.long())
+        loss = self.criterion(outputs.float(), labels.long())
         self.log_metrics(outputs, labels, "val", loss)
         return loss
 
     def test_step(self, batch: Any, batch_idx: int) -> torch.Tensor:
         inputs, labels = batch
         outputs = self.forward(inputs)
-        loss = self.criterion(outputs, labels.long())
+        loss = self.criterion(outputs.float(), labels.long())
         self.log_metrics(outputs, labels, "test", loss)
         return loss
 
+    @torch.inference_mode()
     def predict_step(self, batch: Any) -> torch.Tensor:
         prediction = self.forward(batch)
         probabilities = torch.nn.functional.softmax(prediction, dim=1)[:, 1, :, :]
@@ -161,6 +316,15 @@ class PrithviSegmentationModule(pl.LightningModule):
         )
         return [optimizer], [scheduler]
 
+    def on_train_epoch_end(self) -> None:
+        self.log_epoch_metrics("train")
+
+    def on_validation_epoch_end(self) -> None:
+        self.log_epoch_metrics("val")
+
+    def on_test_epoch_end(self) -> None:
+        self.log_epoch_metrics("test")
+
     def log_metrics(
         self,
         predictions: torch.Tensor,
@@ -168,7 +332,6 @@ class PrithviSegmentationModule(pl.LightningModule):
         stage: str,
         loss: torch.Tensor,
     ) -> None:
-        out = self.compute_metrics(predictions, labels)
         self.log(
             f"{stage}_loss",
             loss,
@@ -177,148 +340,110 @@ class PrithviSegmentationModule(pl.LightningModule):
             prog_bar=True,
             logger=True,
         )
-        self.log(
-            f"{stage}_aAcc",
-            out["acc"],
-            on_step=True,
+        confusion = getattr(self, f"{stage}_confusion")
+        confusion.update(predictions, labels.long())
+
+    def log_epoch_metrics(self, stage: str) -> None:
+        confusion = getattr(self, f"{stage}_confusion")
+        out = self.compute_metrics(confusion.compute())
+        confusion.reset()
+        self.log_dict(
+            {f"{stage}_aAcc": out["acc"], f"{stage}_mIoU": out["iou"]},
+            on_step=False,
             on_epoch=True,
             prog_bar=True,
             logger=True,
         )
-        self.log(
-            f"{stage}_mIoU",
-            out["iou"],
-            on_step=True,
+        per_class_metrics: dict[str, float] = {}
+        for name, key in (
+            ("IoU", "iou_per_class"),
+            ("Acc", "acc_per_class"),
+            ("Precision", "precision_per_class"),
+            ("Recall", "recall_per_class"),
+        ):
+            per_class_metrics.update(
+                {f"{stage}_{name}_{idx}": value for idx, value in enumerate(out[key])}
+            )
+        self.log_dict(
+            per_class_metrics,
+            on_step=False,
             on_epoch=True,
-            prog_bar=True,
+            prog_bar=False,
             logger=True,
         )
-        for idx, value in enumerate(out["iou_per_class"]):
-            self.log(
-                f"{stage}_IoU_{idx}",
-                value,
-                on_step=True,
-                on_epoch=True,
-                prog_bar=True,
-                logger=True,
-            )
-        for idx, value in enumerate(out["acc_per_class"]):
-            self.log(
-                f"{stage}_Acc_{idx}",
-                value,
-                on_step=True,
-                on_epoch=True,
-                prog_bar=True,
-                logger=True,
-            )
-        for idx, value in enumerate(out["precision_per_class"]):
-            self.log(
-                f"{stage}_Precision_{idx}",
-                value,
-                on_step=True,
-                on_epoch=True,
-                prog_bar=True,
-                logger=True,
-            )
-        for idx, value in enumerate(out["recall_per_class"]):
-            self.log(
-                f"{stage}_Recall_{idx}",
-                value,
-                on_step=True,
-                on_epoch=True,
-                prog_bar=True,
-                logger=True,
-            )
 
-    def compute_metrics(
-        self, pred_mask: torch.Tensor, gt_mask: torch.Tensor
-    ) -> dict[str, List[float]]:
-        pred_mask = torch.argmax(pred_mask, dim=1)
-        no_ignore = gt_mask.ne(self.ignore_index).to(self.device)
-        pred_mask = pred_mask.masked_select(no_ignore).cpu().numpy()
-        gt_mask = gt_mask.masked_select(no_ignore).cpu().numpy()
-        classes = np.unique(np.concatenate((gt_mask, pred_mask)))
-
-        iou_per_class = []
-        accuracy_per_class = []
-        precision_per_class = []
-        recall_per_class = []
-
-        for clas in classes:
-            pred_cls = pred_mask == clas
-            gt_cls = gt_mask == clas
-
-            intersection = np.logical_and(pred_cls, gt_cls)
-            union = np.logical_or(pred_cls, gt_cls)
-            true_positive = np.sum(intersection)
-            false_positive = np.sum(pred_cls) - true_positive
-            false_negative = np.sum(gt_cls) - true_positive
-
-            if np.any(union):
-                iou = np.sum(intersection) / np.sum(union)
-                iou_per_class.append(iou)
-
-            accuracy = true_positive / np.sum(gt_cls) if np.sum(gt_cls) > 0 else 0
-            accuracy_per_class.append(accuracy)
-
-            precision = (
-                true_positive / (true_positive + false_positive)
-                if (true_positive + false_positive) > 0
-                else 0
-            )
-            precision_per_class.append(precision)
-
-            recall = (
-                true_positive / (true_positive + false_negative)
-                if (true_positive + false_negative) > 0
-                else 0
-            )
-            recall_per_class.append(recall)
+    @staticmethod
+    def compute_metrics(confusion: torch.Tensor) -> dict[str, Any]:
+        # Rows index the ground truth class, columns the predicted class.
+        true_positive = confusion.diag().float()
+        gt_total = confusion.sum(1).float()
+        pred_total = confusion.sum(0).float()
+        union = gt_total + pred_total - true_positive
+
+        # Only report classes that appear in either the prediction or the label.
+        present = union > 0
+        iou_per_class = true_positive[present] / union[present]
+        accuracy_per_class = true_positive[present] / gt_total[present].clamp(min=1)
+        precision_per_class = true_positive[present] / pred_total[present].clamp(
+            min=1
+        )
+        recall_per_class = accuracy_per_class
 
-        mean_iou = np.mean(iou_per_class) if iou_per_class else 0.0
-        overall_accuracy = np.sum(pred_mask == gt_mask) / gt_mask.size
+        mean_iou = iou_per_class.mean().item() if iou_per_class.numel() else 0.0
+        overall_accuracy = (true_positive.sum() / confusion.sum().clamp(min=1)).item()
 
         return {
             "iou": mean_iou,
             "acc": overall_accuracy,
-            "acc_per_class": accuracy_per_class,
-            "iou_per_class": iou_per_class,
-            "precision_per_class": precision_per_class,
-            "recall_per_class": recall_per_class,
+            "acc_per_class": accuracy_per_class.tolist(),
+            "iou_per_class": iou_per_class.tolist(),
+            "precision_per_class": precision_per_class.tolist(),
+            "recall_per_class": recall_per_class.tolist(),
         }
 
 
-def compute_mean_std(data_loader: DataLoader) -> Tuple[List[float], List[float]]:
-    mean = 0.0
-    var = 0.0
-    nb_samples = 0
+def compute_mean_std(
+    data_loader: DataLoader, device: str = "cpu"
+) -> Tuple[List[float], List[float]]:
+    # Per-channel running statistics merged batch by batch with Chan et al.'s
+    # parallel algorithm, kept in float64 so large datasets stay numerically stable.
+    # The accumulators live on `device` and are only copied back at the end.
+    count = 0
+    mean = torch.zeros((), dtype=torch.float64, device=device)
+    m2 = torch.zeros((), dtype=torch.float64, device=device)
 
     for data, _ in data_loader:
-        batch_samples = data.size(0)
-        data = data.view(batch_samples, data.size(1), -1)
-
-        nb_samples += batch_samples
+        data = data.to(device, non_blocking=True)
+        data = data.view(data.size(0), data.size(1), -1).double()
+        batch_count = data.size(0) * data.size(2)
+        batch_mean = data.mean(dim=[0, 2])
+        batch_m2 = ((data - batch_mean.view(1, -1, 1)) ** 2).sum(dim=[0, 2])
 
-        mean += data.mean(2).sum(0)
+        total = count + batch_count
+        delta = batch_mean - mean
+        mean = mean + delta * batch_count / total
+        m2 = m2 + batch_m2 + delta**2 * count * batch_count / total
+        count = total
 
-        var += data.var(2, unbiased=False).sum(0)
-
-    mean /= nb_samples
-    var /= nb_samples
-    std = torch.sqrt(var)
-    return mean.tolist(), std.tolist()  # type:ignore
+    if count == 0:
+        raise ValueError("Cannot compute mean and std of an empty data loader.")
+    std = torch.sqrt(m2 / count)
+    return mean.cpu().tolist(), std.cpu().tolist()
 
 
 @hydra.main(config_path="configs", version_base=None, config_name="config")
 def main(cfg: DictConfig) -> None:
     log.info(f"Script: {__file__}")
     log.info(f"Imported hydra config:\n{OmegaConf.to_yaml(cfg)}")
+    configure_determinism(cfg.train.get("deterministic", False))
 
     BANDS = cfg.dataloader.bands
-    MEAN = cfg.dataloader.mean
-    STD = cfg.dataloader.std
+    # Built once and shared by every preprocessing partial and the model.
+    MEAN = torch.tensor(list(cfg.dataloader.mean))
+    STD = torch.tensor(list(cfg.dataloader.std))
     IM_SIZE = cfg.dataloader.img_size
     TEMPORAL_SIZE = cfg.dataloader.temporal_dim
+    GPU_NORMALIZE = cfg.dataloader.get("gpu_normalize", True)
 
     batch_size = cfg.train.batch_size
     root_dir = cfg.root_dir
@@ -326,75 +451,86 @@ def main(cfg: DictConfig) -> None:
     train_filepath = cfg.train_filepath
     test_filepath = cfg.test_filepath
     checkpoint_path = cfg.checkpoint_path
+    replace_label = cfg.dataloader.replace_label
+    reduce_to_zero = cfg.dataloader.reduce_to_zero
+    no_data_value = cfg.dataloader.no_data_value
+    constant_multiplier = cfg.dataloader.constant_multiplier
+    dataloader_kwargs = dict(
+        num_workers=cfg.train.get("num_workers"),
+        pin_memory=cfg.train.get("pin_memory", True),
+        persistent_workers=cfg.train.get("persistent_workers", True),
+        prefetch_factor=cfg.train.get("prefetch_factor", 4),
+    )
 
-    if cfg.mode == "stats":
-        train_dataset = InstaGeoDataset(
-            filename=train_filepath,
+    def make_dataset(
+        filename: str, preprocess_func: Callable, include_filenames: bool = False
+    ) -> InstaGeoDataset:
+        return InstaGeoDataset(
+            filename=filename,
             input_root=root_dir,
-            preprocess_func=partial(
+            preprocess_func=preprocess_func,
+            bands=BANDS,
+            replace_label=replace_label,
+            reduce_to_zero=reduce_to_zero,
+            no_data_value=no_data_value,
+            constant_multiplier=constant_multiplier,
+            include_filenames=include_filenames,
+        )
+
+    if cfg.mode == "stats":
+        train_dataset = make_dataset(
+            train_filepath,
+            partial(
                 process_and_augment,
                 mean=[0] * len(MEAN),
                 std=[1] * len(STD),
                 temporal_size=TEMPORAL_SIZE,
                 im_size=IM_SIZE,
             ),
-            bands=BANDS,
-            replace_label=cfg.dataloader.replace_label,
-            reduce_to_zero=cfg.dataloader.reduce_to_zero,
-            no_data_value=cfg.dataloader.no_data_value,
-            constant_multiplier=cfg.dataloader.constant_multiplier,
         )
         train_loader = create_dataloader(
             train_dataset,
             batch_size=batch_size,
             shuffle=True,
-            num_workers=4,
+            **dataloader_kwargs,
+        )
+        mean, std = compute_mean_std(
+            train_loader, device="cuda" if get_device() == "gpu" else "cpu"
         )
-        mean, std = compute_mean_std(train_loader)
         print(mean)
         print(std)
         exit(0)
 
     if cfg.mode == "train":
         check_required_flags(["root_dir", "train_filepath", "valid_filepath"], cfg)
-        train_dataset = InstaGeoDataset(
-            filename=train_filepath,
-            input_root=root_dir,
-            preprocess_func=partial(
+        train_dataset = make_dataset(
+            train_filepath,
+            partial(
                 process_and_augment,
                 mean=MEAN,
                 std=STD,
                 temporal_size=TEMPORAL_SIZE,
                 im_size=IM_SIZE,
+                gpu_normalize=GPU_NORMALIZE,
             ),
-            bands=BANDS,
-            replace_label=cfg.dataloader.replace_label,
-            reduce_to_zero=cfg.dataloader.reduce_to_zero,
-            no_data_value=cfg.dataloader.no_data_value,
-            constant_multiplier=cfg.dataloader.constant_multiplier,
         )
 
-        valid_dataset = InstaGeoDataset(
-            filename=valid_filepath,
-            input_root=root_dir,
-            preprocess_func=partial(
+        valid_dataset = make_dataset(
+            valid_filepath,
+            partial(
                 process_and_augment,
                 mean=MEAN,
                 std=STD,
                 temporal_size=TEMPORAL_SIZE,
                 im_size=IM_SIZE,
+                gpu_normalize=GPU_NORMALIZE,
             ),
-            bands=BANDS,
-            replace_label=cfg.dataloader.replace_label,
-            reduce_to_zero=cfg.dataloader.reduce_to_zero,
-            no_data_value=cfg.dataloader.no_data_value,
-            constant_multiplier=cfg.dataloader.constant_multiplier,
         )
         train_loader = create_dataloader(
-            train_dataset, batch_size=batch_size, shuffle=True, num_workers=4, pin_memory=True
+            train_dataset, batch_size=batch_size, shuffle=True, **dataloader_kwargs
         )
         valid_loader = create_dataloader(
-            valid_dataset, batch_size=batch_size, shuffle=False, num_workers=4, pin_memory=True
+            valid_dataset, batch_size=batch_size, shuffle=False, **dataloader_kwargs
         )
         model = PrithviSegmentationModule(
             image_size=IM_SIZE,
@@ -405,6 +541,10 @@ def main(cfg: DictConfig) -> None:
             class_weights=cfg.train.class_weights,
             ignore_index=cfg.train.ignore_index,
             weight_decay=cfg.train.weight_decay,
+            mean=MEAN if GPU_NORMALIZE else None,
+            std=STD if GPU_NORMALIZE else None,
+            compile_model=cfg.model.get("compile", False),
+            channels_last=cfg.model.get("channels_last", False),
         )
         hydra_out_dir = hydra.core.hydra_config.HydraConfig.get().runtime.output_dir
         checkpoint_callback = ModelCheckpoint(
@@ -418,9 +558,14 @@ def main(cfg: DictConfig) -> None:
 
         logger = TensorBoardLogger(hydra_out_dir, name="instageo")
 
+        accelerator = get_device()
         trainer = pl.Trainer(
-            accelerator=get_device(),
+            accelerator=accelerator,
+            strategy=get_strategy(accelerator, cfg),
+            devices=cfg.train.get("devices", "auto"),
             max_epochs=cfg.train.num_epochs,
+            accumulate_grad_batches=cfg.train.get("accumulate_grad_batches", 1),
+            precision=cfg.train.get("precision", "bf16-mixed"),
             callbacks=[checkpoint_callback],
             logger=logger
         )
@@ -429,10 +574,9 @@ def main(cfg: DictConfig) -> None:
 
     elif cfg.mode == "eval":
         check_required_flags(["root_dir", "test_filepath", "checkpoint_path"], cfg)
-        test_dataset = InstaGeoDataset(
-            filename=test_filepath,
-            input_root=root_dir,
-            preprocess_func=partial(
+        test_dataset = make_dataset(
+            test_filepath,
+            partial(
                 process_test,
                 mean=MEAN,
                 std=STD,
@@ -440,16 +584,15 @@ def main(cfg: DictConfig) -> None:
                 img_size=cfg.test.img_size,
                 crop_size=cfg.test.crop_size,
                 stride=cfg.test.stride,
+                gpu_normalize=GPU_NORMALIZE,
             ),
-            bands=BANDS,
-            replace_label=cfg.dataloader.replace_label,
-            reduce_to_zero=cfg.dataloader.reduce_to_zero,
-            no_data_value=cfg.dataloader.no_data_value,
-            constant_multiplier=cfg.dataloader.constant_multiplier,
             include_filenames=True,
         )
         test_loader = create_dataloader(
-            test_dataset, batch_size=batch_size, collate_fn=eval_collate_fn
+            test_dataset,
+            batch_size=batch_size,
+            collate_fn=eval_collate_fn,
+            **dataloader_kwargs,
         )
         model = PrithviSegmentationModule.load_from_checkpoint(
             checkpoint_path,
@@ -461,8 +604,15 @@ def main(cfg: DictConfig) -> None:
             class_weights=cfg.train.class_weights,
             ignore_index=cfg.train.ignore_index,
             weight_decay=cfg.train.weight_decay,
+            mean=MEAN if GPU_NORMALIZE else None,
+            std=STD if GPU_NORMALIZE else None,
+            compile_model=cfg.model.get("compile", False),
+            channels_last=cfg.model.get("channels_last", False),
         )
-        trainer = pl.Trainer(accelerator=get_device())
+        accelerator = get_device()
+        # A single device keeps DistributedSampler from padding the test set
+        # with duplicate samples, which would skew the reported metrics.
+        trainer = pl.Trainer(accelerator=accelerator, devices=1)
         result = trainer.test(model, dataloaders=test_loader)
         log.info(f"Evaluation results:\n{result}")
 
@@ -476,6 +626,10 @@ def main(cfg: DictConfig) -> None:
             temporal_step=cfg.dataloader.temporal_dim,
             class_weights=cfg.train.class_weights,
             ignore_index=cfg.train.ignore_index,
+            mean=MEAN if GPU_NORMALIZE else None,
+            std=STD if GPU_NORMALIZE else None,
+            compile_model=cfg.model.get("compile", False),
+            channels_last=cfg.model.get("channels_last", False),
         )
         model.eval()
         infer_filepath = os.path.join(root_dir, cfg.test_filepath)
@@ -486,45 +640,42 @@ def main(cfg: DictConfig) -> None:
         os.makedirs(output_dir, exist_ok=True)
         with open(os.path.join(infer_filepath)) as json_file:
             hls_dataset = json.load(json_file)
-        for key, hls_tile_path in tqdm(
-            hls_dataset.items(), desc="Processing HLS Dataset"
-        ):
+        device = get_device()
+        prefetch_depth = cfg.test.get("prefetch", 2)
+
+        def load_tile(
+            item: Tuple[str, Any]
+        ) -> Tuple[str, Tuple[torch.Tensor, np.ndarray, Any, Any] | None]:
+            key, hls_tile_path = item
             try:
-                hls_tile, _ = process_data(
+                hls_tile, crs, transform = get_georeferenced_raster_data(
                     hls_tile_path,
-                    None,
+                    is_label=False,
                     bands=cfg.dataloader.bands,
                     no_data_value=cfg.dataloader.no_data_value,
-                    constant_multiplier=cfg.dataloader.constant_multiplier,
                     mask_cloud=cfg.test.mask_cloud,
-                    replace_label=cfg.dataloader.replace_label,
-                    reduce_to_zero=cfg.dataloader.reduce_to_zero,
                 )
+                hls_tile = hls_tile * cfg.dataloader.constant_multiplier
             except rasterio.RasterioIOError:
-                continue
-            nan_mask = hls_tile == cfg.dataloader.no_data_value
-            nan_mask = np.any(nan_mask, axis=0).astype(int)
+                return key, None
+            nan_mask = np.any(hls_tile == cfg.dataloader.no_data_value, axis=0)
             hls_tile, _ = process_and_augment(
                 hls_tile,
                 None,
-                mean=cfg.dataloader.mean,
-                std=cfg.dataloader.std,
+                mean=MEAN,
+                std=STD,
                 temporal_size=cfg.dataloader.temporal_dim,
                 augment=False,
+                gpu_normalize=GPU_NORMALIZE,
             )
-            prediction = sliding_window_inference(
-                hls_tile,
-                model,
-                window_size=(cfg.test.img_size, cfg.test.img_size),
-                stride=cfg.test.stride,
-                batch_size=cfg.train.batch_size,
-                device=get_device(),
-            )
-            prediction = np.where(nan_mask == 1, np.nan, prediction)
-            prediction_filename = os.path.join(output_dir, f"{key}_prediction.tif")
-            with rasterio.open(hls_tile_path["tiles"]["B02_0"]) as src:
-                crs = src.crs
-                transform = src.transform
+            # Page-locked memory lets the host-to-device copy run asynchronously.
+            if device == "gpu":
+                hls_tile = hls_tile.pin_memory()
+            return key, (hls_tile, nan_mask, crs, transform)
+
+        def write_prediction(
+            prediction: np.ndarray, prediction_filename: str, crs: Any, transform: Any
+        ) -> None:
             with rasterio.open(
                 prediction_filename,
                 "w",
@@ -535,33 +686,88 @@ def main(cfg: DictConfig) -> None:
                 dtype=str(prediction.dtype),
                 crs=crs,
                 transform=transform,
+                tiled=True,
+                blockxsize=512,
+                blockysize=512,
+                compress="deflate",
+                # Floating point predictor for probabilities, horizontal otherwise.
+                predictor=3 if prediction.dtype.kind == "f" else 2,
+                num_threads="ALL_CPUS",
+                BIGTIFF="IF_SAFER",
             ) as dst:
                 dst.write(prediction, 1)
 
+        # Tiles are read ahead and predictions written behind on worker threads, so
+        # the model is kept busy while rasterio does I/O. `prefetch_map` keeps
+        # `prefetch_depth + 1` reads in flight and the write loop below at most
+        # `prefetch_depth` writes, so the pools are sized to match.
+        with (
+            ThreadPoolExecutor(max_workers=prefetch_depth + 1) as read_executor,
+            ThreadPoolExecutor(max_workers=max(1, prefetch_depth)) as write_executor,
+        ):
+            pending_writes: Deque[Future] = deque()
+            for key, tile in tqdm(
+                prefetch_map(
+                    load_tile, hls_dataset.items(), read_executor, prefetch_depth
+                ),
+                total=len(hls_dataset),
+                desc="Processing HLS Dataset",
+            ):
+                if tile is None:
+                    continue
+                hls_tile, nan_mask, crs, transform = tile
+                prediction = sliding_window_inference(
+                    hls_tile,
+                    model,
+                    window_size=(cfg.test.img_size, cfg.test.img_size),
+                    stride=cfg.test.stride,
+                    batch_size=cfg.train.batch_size,
+                    device=device,
+                )
+                # Mask in place so the prediction stays float32 rather than being
+                # promoted to a new float64 array by np.where.
+                prediction = prediction.astype(np.float32, copy=False)
+                prediction[nan_mask] = np.float32("nan")
+                prediction_filename = os.path.join(
+                    output_dir, f"{key}_prediction.tif"
+                )
+                # Bound the number of predictions held in memory awaiting a write.
+                while pending_writes and len(pending_writes) >= prefetch_depth:
+                    pending_writes.popleft().result()
+                pending_writes.append(
+                    write_executor.submit(
+                        write_prediction,
+                        prediction,
+                        prediction_filename,
+                        crs,
+                        transform,
+                    )
+                )
+            for future in pending_writes:
+                future.result()
+
     elif cfg.mode == "chip_inference":
         check_required_flags(["root_dir", "test_filepath", "checkpoint_path"], cfg)
         output_dir = os.path.join(root_dir, "predictions")
         os.makedirs(output_dir, exist_ok=True)
-        test_dataset = InstaGeoDataset(
-            filename=test_filepath,
-            input_root=root_dir,
-            preprocess_func=partial(
+        test_dataset = make_dataset(
+            test_filepath,
+            partial(
                 process_and_augment,
                 mean=MEAN,
                 std=STD,
                 temporal_size=TEMPORAL_SIZE,
                 im_size=cfg.test.img_size,
                 augment=False,
+                gpu_normalize=GPU_NORMALIZE,
             ),
-            bands=BANDS,
-            replace_label=cfg.dataloader.replace_label,
-            reduce_to_zero=cfg.dataloader.reduce_to_zero,
-            no_data_value=cfg.dataloader.no_data_value,
-            constant_multiplier=cfg.dataloader.constant_multiplier,
             include_filenames=True,
         )
         test_loader = create_dataloader(
-            test_dataset, batch_size=batch_size, collate_fn=infer_collate_fn
+            test_dataset,
+            batch_size=batch_size,
+            collate_fn=infer_collate_fn,
+            **dataloader_kwargs,
         )
         model = PrithviSegmentationModule.load_from_checkpoint(
             checkpoint_path,
@@ -573,6 +779,10 @@ def main(cfg: DictConfig) -> None:
             class_weights=cfg.train.class_weights,
             ignore_index=cfg.train.ignore_index,
             weight_decay=cfg.train.weight_decay,
+            mean=MEAN if GPU_NORMALIZE else None,
+            std=STD if GPU_NORMALIZE else None,
+            compile_model=cfg.model.get("compile", False),
+            channels_last=cfg.model.get("channels_last", False),
         )
         chip_inference(test_loader, output_dir, model, device=get_device())
 
@@ -22,6 +22,7 @@ data_dependencies = [
 model_dependencies = [
     # Add dependencies specific to the model component
     "pytorch_lightning",
+    "torchmetrics",
     "torch",
     "timm==0.4.12",
     "einops",
@@ -3,12 +3,14 @@ from functools import partial
 import numpy as np
 import pandas as pd
 import pytest
+import rasterio
 import torch
 from PIL import Image
 
 from instageo.model.dataloader import (
     InstaGeoDataset,
     crop_array,
+    get_georeferenced_raster_data,
     get_raster_data,
     load_data_from_csv,
     normalize_and_convert_to_tensor,
@@ -61,12 +63,42 @@ def test_process_and_augment():
     assert processed_label.shape == torch.Size([224, 224])
 
 
+def test_process_and_augment_gpu_normalize():
+    x = np.random.rand(6, 256, 256).astype(np.float32)
+    processed_ims, _ = process_and_augment(
+        x,
+        None,
+        mean=[0.5, 0.5, 0.5],
+        std=[2.0, 2.0, 2.0],
+        temporal_size=2,
+        augment=False,
+        gpu_normalize=True,
+    )
+
+    assert processed_ims.shape == torch.Size([3, 2, 256, 256])
+    expected = torch.from_numpy(x).reshape(2, 3, 256, 256).permute(1, 0, 2, 3)
+    assert torch.allclose(processed_ims, expected)
+
+
 def test_get_raster_data_with_str():
     test_fname = "tests/data/sample.tif"
     result = get_raster_data(test_fname, is_label=False, bands=[0])
     assert isinstance(result, np.ndarray)
 
 
+def test_get_georeferenced_raster_data():
+    test_fname = "tests/data/sample.tif"
+    result, crs, transform = get_georeferenced_raster_data(
+        test_fname, is_label=False, bands=[0]
+    )
+    with rasterio.open(test_fname) as src:
+        assert crs == src.crs
+        assert transform == src.transform
+    np.testing.assert_array_equal(
+        result, get_raster_data(test_fname, is_label=False, bands=[0])
+    )
+
+
 def test_get_raster_data_with_dict():
     band_files = {
         "tiles": {
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, call, patch
 
 import numpy as np
@@ -5,7 +6,11 @@ import pytest
 import torch
 from torch.utils.data import DataLoader
 
-from instageo.model.infer_utils import chip_inference, sliding_window_inference
+from instageo.model.infer_utils import (
+    chip_inference,
+    prefetch_map,
+    sliding_window_inference,
+)
 
 
 @pytest.fixture
@@ -29,6 +34,12 @@ def test_sliding_window_inference(model):
     assert np.unique(prediction) == 1
 
 
+def test_prefetch_map_preserves_order():
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(prefetch_map(lambda x: x * 2, range(10), executor, depth=3))
+    assert results == [x * 2 for x in range(10)]
+
+
 @patch("instageo.model.infer_utils.save_prediction")
 @patch("instageo.model.infer_utils.rasterio.open")
 @patch("instageo.model.infer_utils.ThreadPoolExecutor")
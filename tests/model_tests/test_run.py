@@ -0,0 +1,120 @@
+import pytest
+import torch
+from omegaconf import OmegaConf
+from pytorch_lightning.strategies import DDPStrategy
+from torch.utils.data import DataLoader, TensorDataset
+from torchmetrics.classification import MulticlassConfusionMatrix
+
+from instageo.model.run import (
+    PrithviSegmentationModule,
+    TwoClassConfusionMatrix,
+    compute_mean_std,
+    eval_collate_fn,
+    get_strategy,
+)
+
+
+def test_compute_metrics():
+    # Rows are ground truth, columns are predictions; class 2 never appears.
+    confusion = torch.tensor([[3, 1, 0], [2, 4, 0], [0, 0, 0]])
+    metrics = PrithviSegmentationModule.compute_metrics(confusion)
+    assert metrics["iou_per_class"] == pytest.approx([0.5, 4 / 7])
+    assert metrics["acc_per_class"] == pytest.approx([0.75, 4 / 6])
+    assert metrics["precision_per_class"] == pytest.approx([0.6, 0.8])
+    assert metrics["recall_per_class"] == pytest.approx([0.75, 4 / 6])
+    assert metrics["iou"] == pytest.approx((0.5 + 4 / 7) / 2)
+    assert metrics["acc"] == pytest.approx(0.7)
+
+
+def test_compute_metrics_empty():
+    metrics = PrithviSegmentationModule.compute_metrics(torch.zeros(2, 2))
+    assert metrics["iou"] == 0.0
+    assert metrics["acc"] == 0.0
+    assert metrics["iou_per_class"] == []
+    assert metrics["acc_per_class"] == []
+
+
+@pytest.mark.parametrize(
+    "accelerator, devices, expected_ddp",
+    [
+        ("gpu", 1, False),
+        ("gpu", "1", False),
+        ("gpu", "0,", False),
+        ("gpu", [0], False),
+        ("gpu", 2, True),
+        ("gpu", "0,1", True),
+        ("gpu", [0, 1], True),
+        ("cpu", 4, False),
+    ],
+)
+def test_get_strategy(accelerator, devices, expected_ddp):
+    cfg = OmegaConf.create({"train": {"devices": devices}})
+    strategy = get_strategy(accelerator, cfg)
+    assert isinstance(strategy, DDPStrategy) == expected_ddp
+    if not expected_ddp:
+        assert strategy == "auto"
+
+
+def test_compute_mean_std():
+    torch.manual_seed(0)
+    x = torch.rand(10, 6, 3, 8, 8) * 1000
+    # 10 samples in batches of 3 leaves a short final batch.
+    loader = DataLoader(TensorDataset(x, torch.zeros(10)), batch_size=3)
+    mean, std = compute_mean_std(loader)
+    flat = x.double().transpose(0, 1).reshape(6, -1)
+    assert torch.allclose(torch.tensor(mean, dtype=torch.float64), flat.mean(dim=1))
+    assert torch.allclose(
+        torch.tensor(std, dtype=torch.float64), flat.std(dim=1, unbiased=False)
+    )
+
+
+def test_compute_mean_std_empty_loader():
+    loader = DataLoader(
+        TensorDataset(torch.zeros(0, 6, 3, 8, 8), torch.zeros(0)), batch_size=3
+    )
+    with pytest.raises(ValueError):
+        compute_mean_std(loader)
+
+
+@pytest.mark.parametrize("ignore_index", [None, -100])
+def test_two_class_confusion_matrix_matches_multiclass(ignore_index):
+    torch.manual_seed(0)
+    logits = torch.randn(4, 2, 16, 16)
+    # Tied logits must resolve to class 0, as argmax does.
+    tied = torch.rand(4, 16, 16) < 0.2
+    logits[:, 1][tied] = logits[:, 0][tied]
+    labels = torch.randint(0, 2, (4, 16, 16))
+    if ignore_index is not None:
+        labels[torch.rand(4, 16, 16) < 0.2] = ignore_index
+
+    two_class = TwoClassConfusionMatrix(ignore_index=ignore_index)
+    multiclass = MulticlassConfusionMatrix(2, ignore_index=ignore_index)
+    for _ in range(2):
+        two_class.update(logits, labels)
+        multiclass.update(logits, labels)
+    assert torch.equal(two_class.compute(), multiclass.compute())
+
+
+def test_eval_collate_fn_in_worker():
+    torch.manual_seed(0)
+    # Test crops yield a variable number of chips per tile.
+    sizes = [1, 3, 2, 1]
+    samples = [
+        ((torch.rand(n, 6, 3, 8, 8), torch.randint(0, 2, (n, 8, 8))), f"tile_{i}")
+        for i, n in enumerate(sizes)
+    ]
+    # A worker process takes the shared-memory branch of `cat_samples`.
+    loader = DataLoader(
+        samples, batch_size=2, num_workers=1, collate_fn=eval_collate_fn
+    )
+    batches = list(loader)
+    assert len(batches) == 2
+    for b, (data, labels) in enumerate(batches):
+        expected = samples[2 * b : 2 * b + 2]
+        n = sum(item[0][0].shape[0] for item in expected)
+        assert data.shape == (n, 6, 3, 8, 8)
+        assert labels.shape == (n, 8, 8)
+        assert data.is_shared()
+        assert labels.is_shared()
+        assert torch.equal(data, torch.cat([item[0][0] for item in expected]))
+        assert torch.equal(labels, torch.cat([item[0][1] for item in expected]))